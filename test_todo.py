@@ -0,0 +1,168 @@
+import json
+
+import pytest
+
+import todo
+
+
+@pytest.fixture(autouse=True)
+def task_dir(tmp_path, monkeypatch):
+    """Run each test in an empty directory with a cold task cache."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(todo, "_TASKS_CACHE", None)
+    monkeypatch.setattr(todo, "_TASKS_STAMP", None)
+    monkeypatch.setattr(todo, "_UNRECOGNIZED_RECORDS", [])
+    return tmp_path
+
+
+def reload_tasks():
+    """Load tasks from disk, bypassing the in-memory cache."""
+    todo._TASKS_STAMP = None
+    return todo.load_tasks()
+
+
+def read_records():
+    """Return the records in the task file, decoded with the stdlib."""
+    return [json.loads(line) for line in todo.TODO_FILE.read_text().splitlines()]
+
+
+def test_completion_is_logged_and_replayed():
+    todo.add_task("a")
+    todo.add_task("b")
+    before = todo.TODO_FILE.read_bytes()
+
+    todo.complete_task(1)
+
+    assert todo.TODO_FILE.read_bytes() == before
+    assert todo.WAL_FILE.exists()
+    tasks, next_id = reload_tasks()
+    assert tasks[1]["completed"] is True
+    assert tasks[2]["completed"] is False
+    assert next_id == 3
+
+
+def test_log_is_compacted_at_limit(monkeypatch):
+    monkeypatch.setattr(todo, "WAL_LIMIT", 1)
+    todo.add_task("a")
+
+    todo.complete_task(1)
+
+    assert not todo.WAL_FILE.exists()
+    assert read_records()[0]["completed"] is True
+
+
+def test_legacy_file_is_migrated():
+    todo.LEGACY_FILE.write_text(json.dumps([
+        {"id": 1, "description": "a", "completed": False},
+        {"id": 3, "description": "b", "completed": True},
+    ]))
+    todo.WAL_FILE.write_text('{"op":"complete","id":1}\n')
+
+    tasks, next_id = todo.load_tasks()
+
+    assert sorted(tasks) == [1, 3]
+    assert tasks[1]["completed"] is True
+    assert next_id == 4
+    assert not todo.LEGACY_FILE.exists()
+    assert todo.LEGACY_FILE.with_suffix(".json.bak").exists()
+    assert reload_tasks() == (tasks, next_id)
+
+
+def test_legacy_file_is_kept_when_save_fails(monkeypatch, task_dir):
+    todo.LEGACY_FILE.write_text(json.dumps(
+        {"tasks": [{"id": 1, "description": "a", "completed": False}], "next_id": 2}
+    ))
+
+    def fail(*args):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(todo.os, "replace", fail)
+    tasks, next_id = todo.load_tasks()
+
+    assert sorted(tasks) == [1]
+    assert next_id == 2
+    assert todo.LEGACY_FILE.exists()
+    assert not todo.TODO_FILE.exists()
+    assert not list(task_dir.glob("*.tmp"))
+
+
+def test_torn_last_line_is_skipped_and_repaired():
+    todo.TODO_FILE.write_text(
+        '{"id":1,"description":"a","completed":false}\n'
+        '{"next_id":2}\n'
+        '{"id":2,"descr'
+    )
+
+    tasks, next_id = todo.load_tasks()
+    assert sorted(tasks) == [1]
+    assert next_id == 2
+
+    todo.add_task("b")
+
+    assert read_records() == [
+        {"id": 1, "description": "a", "completed": False},
+        {"id": 2, "description": "b", "completed": False},
+        {"next_id": 3},
+    ]
+
+
+WELL_FORMED = (
+    '{"id":1,"description":"a","completed":false}\n'
+    '{"id":2,"description":"b","completed":true,"deadline":"2026-01-01"}\n'
+    '{"next_id":4}\n'
+    '{"id":4}\n'
+    '{"id":6,"description":"d","completed":false,"deadline":null}\n'
+)
+MESSY = WELL_FORMED + (
+    '{"id":3,"description":"c","completed":false,"extra":5}\n'
+    '{"id":"5","description":"x","completed":false}\n'
+    '\n'
+    '{"id":7,"desc'
+)
+
+
+def _codecs():
+    """Yield (msgspec, orjson) combinations that can run here."""
+    for use_msgspec in (True, False):
+        for use_orjson in (True, False):
+            marks = []
+            if use_msgspec and todo.msgspec is None:
+                marks.append(pytest.mark.skip(reason="msgspec is not installed"))
+            if use_orjson and todo.orjson is None:
+                marks.append(pytest.mark.skip(reason="orjson is not installed"))
+            yield pytest.param(use_msgspec, use_orjson, marks=marks,
+                               id=f"msgspec={use_msgspec}-orjson={use_orjson}")
+
+
+@pytest.mark.parametrize("use_mmap", [False, True], ids=["read", "mmap"])
+@pytest.mark.parametrize("use_msgspec,use_orjson", list(_codecs()))
+@pytest.mark.parametrize("content", [WELL_FORMED, MESSY], ids=["clean", "messy"])
+def test_decode_paths_agree(monkeypatch, content, use_msgspec, use_orjson, use_mmap):
+    if not use_msgspec:
+        monkeypatch.setattr(todo, "msgspec", None)
+    if not use_orjson:
+        monkeypatch.setattr(todo, "orjson", None)
+    if use_mmap:
+        monkeypatch.setattr(todo, "MMAP_THRESHOLD", 1)
+    todo.TODO_FILE.write_text(content)
+
+    tasks, next_id = todo.load_tasks()
+
+    expected = {
+        1: {"id": 1, "description": "a", "completed": False},
+        2: {"id": 2, "description": "b", "completed": True, "deadline": "2026-01-01"},
+        6: {"id": 6, "description": "d", "completed": False, "deadline": None},
+    }
+    unrecognized = [{"id": 4}]
+    if content is MESSY:
+        expected[3] = {"id": 3, "description": "c", "completed": False, "extra": 5}
+        unrecognized.append({"id": "5", "description": "x", "completed": False})
+    assert tasks == expected
+    assert next_id == 7
+    assert todo._UNRECOGNIZED_RECORDS == unrecognized
+
+    # A full rewrite keeps everything that was decodable
+    todo.delete_task(1)
+    del expected[1]
+    assert reload_tasks() == (expected, 7)
+    assert todo._UNRECOGNIZED_RECORDS == unrecognized
@@ -1,118 +1,542 @@
+import os
 import sys
+import contextlib
 import json
+import mmap
+import stat
+import tempfile
+import threading
 import logging
 from pathlib import Path
 
-# Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler("todo.log"),
-        logging.StreamHandler()
-    ]
-)
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib codec
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # msgspec is optional; records are decoded generically
+    msgspec = None
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; writers are unlocked there
+    fcntl = None
+
+log = logging.getLogger(__name__)
 
 # Define constants
-TODO_FILE = Path("todo.json")
+TODO_FILE = Path("todo.jsonl")  # One JSON record per line
+LEGACY_FILE = Path("todo.json")  # Single-document format of older versions
+TAIL_SIZE = 4096  # Bytes read from the end of the file to append a task
+LOCK_FILE = Path("todo.jsonl.lock")  # Serializes writers; never replaced
+WAL_FILE = Path("todo.wal")  # Completions not yet folded into TODO_FILE
+WAL_LIMIT = 4096  # Log size in bytes at which TODO_FILE is rewritten
+MMAP_THRESHOLD = 1 << 20  # Task files at least this big are parsed via mmap
+
+
+# Reuse one encoder; json.dumps() constructs a fresh JSONEncoder whenever
+# options are given
+_ENCODER = json.JSONEncoder(separators=(",", ":"))
+
+
+def _dumps(obj):
+    """Serialize `obj` to JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return _ENCODER.encode(obj).encode()
+
+
+def _loads(data):
+    """Deserialize JSON bytes."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+if msgspec is not None:
+    class _Record(msgspec.Struct, forbid_unknown_fields=True):
+        """A line of the task file: a task, or the trailing next_id record.
+
+        Absent fields stay UNSET and are dropped by to_builtins(); unknown
+        fields are rejected so the caller can fall back to generic decoding
+        rather than lose them.
+        """
+        id: int | msgspec.UnsetType = msgspec.UNSET
+        description: str | msgspec.UnsetType = msgspec.UNSET
+        completed: bool | msgspec.UnsetType = msgspec.UNSET
+        deadline: str | None | msgspec.UnsetType = msgspec.UNSET
+        next_id: int | msgspec.UnsetType = msgspec.UNSET
+
+    # Decoding against the fixed record schema skips generic type dispatch
+    _RECORD_DECODER = msgspec.json.Decoder(_Record)
+    _MSGSPEC_ENCODER = msgspec.json.Encoder()
+
+
+def _is_valid_record(record):
+    """Return True if `record` is a well-typed task or next_id record."""
+    if not isinstance(record, dict):
+        return False
+    if "next_id" in record:
+        return type(record["next_id"]) is int
+    return (
+        type(record.get("id")) is int
+        and isinstance(record.get("description"), str)
+        and type(record.get("completed")) is bool
+        and isinstance(record.get("deadline"), (str, type(None)))
+    )
+
 
-# Ensure the file exists
-if not TODO_FILE.exists():
-    logging.info(f"{TODO_FILE} not found. Creating an empty task file.")
-    TODO_FILE.write_text(json.dumps([]))
+def _encode_lines(records):
+    """Serialize `records` to JSON Lines bytes."""
+    if msgspec is not None:
+        return _MSGSPEC_ENCODER.encode_lines(records)
+    return b"".join(_dumps(record) + b"\n" for record in records)
+
+
+def _decode_records(data):
+    """Decode JSON Lines bytes into a list of task file records.
+
+    Records are not validated; see _is_valid_record().
+    """
+    if msgspec is not None:
+        try:
+            return msgspec.to_builtins(_RECORD_DECODER.decode_lines(data))
+        except msgspec.DecodeError:
+            pass  # Let the line-by-line path keep or skip the offending lines
+    return list(_decode_lines(data.splitlines()))
+
+
+def _decode_lines(lines):
+    """Yield the JSON records in `lines`, skipping blank and undecodable ones."""
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            yield _loads(line)
+        except json.JSONDecodeError:
+            # Most likely a torn final line from an interrupted append
+            log.error("Skipping a line that could not be decoded.")
+
+
+def _iter_records(size):
+    """Yield the records stored in the task file of the given size."""
+    if size >= MMAP_THRESHOLD:
+        # Slice lines straight out of the page cache instead of copying
+        # the whole file through read() first
+        with open(TODO_FILE, "rb") as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield from _decode_lines(iter(mm.readline, b""))
+    else:
+        # Setting up a mapping costs more than one read() for small files
+        yield from _decode_records(TODO_FILE.read_bytes())
+
+
+# Serializes threads of this process; flock serializes processes. Only
+# the thread holding it touches _LOCK_DEPTH, the current nesting level.
+_THREAD_LOCK = threading.RLock()
+_LOCK_DEPTH = 0
+
+
+@contextlib.contextmanager
+def _task_lock():
+    """Hold an exclusive lock for a read-modify-write of the task files.
+
+    The lock lives on LOCK_FILE rather than TODO_FILE because save_tasks()
+    replaces TODO_FILE, which would leave other writers locking a stale
+    inode. Nested use within one thread is allowed.
+    """
+    global _LOCK_DEPTH
+    with _THREAD_LOCK, contextlib.ExitStack() as stack:
+        if fcntl is not None and not _LOCK_DEPTH:
+            f = stack.enter_context(open(LOCK_FILE, "ab"))
+            fcntl.flock(f, fcntl.LOCK_EX)
+        _LOCK_DEPTH += 1
+        try:
+            yield
+        finally:
+            _LOCK_DEPTH -= 1
+
+
+# In-memory copy of the task file, valid while the (task file stamp,
+# log size) pair is unchanged
+_TASKS_CACHE = None
+_TASKS_STAMP = None
+
+# Records from the last file read that are not well-typed tasks. They are
+# written back unchanged by save_tasks() rather than silently dropped.
+_UNRECOGNIZED_RECORDS = []
+
+
+def _file_stamp(st):
+    """Identify a version of the task file from its stat result.
+
+    Size and inode are included because coarse mtimes can miss an append
+    or a replace made within the same tick.
+    """
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def _copy_tasks(tasks):
+    """Return a copy of `tasks` whose task dicts can be mutated freely."""
+    return {task_id: dict(task) for task_id, task in tasks.items()}
+
+
+def _wal_size():
+    """Return the size of the change log, or 0 if there is none."""
+    try:
+        return WAL_FILE.stat().st_size
+    except FileNotFoundError:
+        return 0
+
+
+def _replay_wal(tasks):
+    """Apply the operations recorded in the change log to `tasks`."""
+    for op in _decode_lines(WAL_FILE.read_bytes().splitlines()):
+        task = tasks.get(op["id"])
+        if op["op"] == "complete" and task is not None:
+            task["completed"] = True
+
+
+def _append_wal(op):
+    """Append `op` to the change log. Return its size before and after."""
+    with open(WAL_FILE, "ab") as f:
+        start = f.tell()
+        f.write(_dumps(op) + b"\n")
+        return start, f.tell()
+
+
+def _migrate_legacy_file():
+    """Convert LEGACY_FILE to TODO_FILE, keeping the original as a backup.
+
+    Runs under the task lock; if another process finished the migration
+    first, its TODO_FILE is loaded instead. Returns the `(tasks, next_id)`
+    pair, which is empty if there is nothing to migrate.
+    """
+    global _UNRECOGNIZED_RECORDS
+    with _task_lock():
+        if TODO_FILE.exists():
+            return load_tasks()
+        _UNRECOGNIZED_RECORDS = []
+        try:
+            data = _loads(LEGACY_FILE.read_bytes())
+        except FileNotFoundError:
+            return {}, 1
+        except json.JSONDecodeError:
+            log.error("Failed to decode %s. Starting with no tasks.", LEGACY_FILE)
+            return {}, 1
+        if isinstance(data, list):
+            # Oldest format: a bare task list
+            data = {
+                "tasks": data,
+                "next_id": max((task["id"] for task in data), default=0) + 1
+            }
+        tasks = {task["id"]: task for task in data["tasks"]}
+        if _wal_size():
+            _replay_wal(tasks)
+        if not save_tasks(tasks, data["next_id"]):
+            return tasks, data["next_id"]  # Keep LEGACY_FILE so the next run retries
+        LEGACY_FILE.replace(LEGACY_FILE.with_suffix(".json.bak"))
+        log.info("Migrated %s to %s.", LEGACY_FILE, TODO_FILE)
+        return tasks, data["next_id"]
 
 
 def load_tasks():
-    """Load tasks from the file."""
+    """Load tasks from the file.
+
+    Returns a `(tasks, next_id)` pair where `tasks` is a dict keyed by task
+    ID, with any logged completions applied. The cached copy is reused
+    while neither file has changed. A missing file means there are no
+    tasks yet; save_tasks() creates it.
+    """
+    global _TASKS_CACHE, _TASKS_STAMP, _UNRECOGNIZED_RECORDS
     try:
-        with open(TODO_FILE, "r") as f:
-            tasks = json.load(f)
-            logging.info("Tasks successfully loaded from the file.")
-            return tasks
-    except json.JSONDecodeError:
-        logging.error("Failed to decode tasks from the file. Resetting the file.")
-        return []
+        st = TODO_FILE.stat()
+    except FileNotFoundError:
+        return _migrate_legacy_file()
+    stamp = (_file_stamp(st), _wal_size())
+    if _TASKS_STAMP == stamp:
+        tasks, next_id = _TASKS_CACHE
+        return _copy_tasks(tasks), next_id
+    tasks = {}
+    next_id = 1
+    unrecognized = []
+    for record in _iter_records(st.st_size):
+        if not _is_valid_record(record):
+            unrecognized.append(record)
+            if isinstance(record, dict) and type(record.get("id")) is int:
+                next_id = max(next_id, record["id"] + 1)  # Never reuse its ID
+        elif "next_id" in record:
+            next_id = max(next_id, record["next_id"])
+        else:
+            tasks[record["id"]] = record
+            next_id = max(next_id, record["id"] + 1)
+    if unrecognized:
+        log.error(
+            "Keeping %d record(s) with unexpected fields or types in %s as is.",
+            len(unrecognized), TODO_FILE
+        )
+    _UNRECOGNIZED_RECORDS = unrecognized
+    log.info("Tasks successfully loaded from the file.")
+    if stamp[1]:
+        _replay_wal(tasks)
+    _TASKS_CACHE = (tasks, next_id)
+    _TASKS_STAMP = stamp
+    return _copy_tasks(tasks), next_id
+
 
+def _file_mode():
+    """Return the permission bits for a rewritten task file.
 
-def save_tasks(tasks):
-    """Save tasks to the file."""
+    An existing file keeps its mode; a new one follows the umask.
+    """
     try:
-        with open(TODO_FILE, "w") as f:
-            json.dump(tasks, f, indent=4)
-            logging.info("Tasks successfully saved to the file.")
+        return stat.S_IMODE(TODO_FILE.stat().st_mode)
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+
+def save_tasks(tasks, next_id):
+    """Save tasks and the next free task ID to the file and refresh the cache.
+
+    The saved file includes every logged change, so the change log is dropped.
+    Returns True if the file was written.
+    """
+    global _TASKS_CACHE, _TASKS_STAMP
+    try:
+        records = list(tasks.values())
+        records.extend(_UNRECOGNIZED_RECORDS)
+        # The counter goes last so that appends can read it from the tail
+        records.append({"next_id": next_id})
+        # Write a private sibling file and swap it in so a crash never
+        # leaves a torn file and concurrent writers never share a temp file
+        fd, tmp = tempfile.mkstemp(
+            dir=TODO_FILE.parent, prefix=TODO_FILE.name + ".", suffix=".tmp"
+        )
+        try:
+            with open(fd, "wb") as f:
+                f.write(_encode_lines(records))
+            # mkstemp() creates the file as 0600; keep the usual permissions
+            os.chmod(tmp, _file_mode())
+            with _task_lock():
+                os.replace(tmp, TODO_FILE)
+                WAL_FILE.unlink(missing_ok=True)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        log.info("Tasks successfully saved to the file.")
     except Exception as e:
-        logging.error(f"Failed to save tasks: {e}")
+        log.error("Failed to save tasks: %s", e)
+        _TASKS_STAMP = None
+        return False
+    _TASKS_CACHE = (_copy_tasks(tasks), next_id)
+    _TASKS_STAMP = (_file_stamp(TODO_FILE.stat()), 0)
+    return True
 
 
-def add_task(description):
-    """Add a new task."""
+def _append_task(description):
+    """Append a task to the end of the file without reading the rest of it.
+
+    The next free ID comes from the last line, which is either the
+    `{"next_id": N}` record written by save_tasks() or the last appended
+    task. Returns the new task, or None if the tail cannot be used.
+    The caller must hold _task_lock().
+    """
+    global _TASKS_CACHE, _TASKS_STAMP
+    try:
+        fd = os.open(TODO_FILE, os.O_RDWR | os.O_APPEND)
+    except FileNotFoundError:
+        return None
+    with open(fd, "r+b") as f:
+        size = f.seek(0, os.SEEK_END)
+        if size:
+            start = max(size - TAIL_SIZE, 0)
+            f.seek(start)
+            tail = f.read()
+            lines = tail[:-1].rsplit(b"\n", 1)
+            if not tail.endswith(b"\n") or (len(lines) == 1 and start):
+                return None  # Torn last line, or longer than TAIL_SIZE
+            try:
+                record = _loads(lines[-1])
+            except json.JSONDecodeError:
+                return None
+            if not _is_valid_record(record):
+                return None
+            next_id = record["next_id"] if "next_id" in record else record["id"] + 1
+        else:
+            next_id = 1
+        task = {"id": next_id, "description": description, "completed": False}
+        before = _file_stamp(os.fstat(f.fileno()))
+        cached = _TASKS_STAMP is not None and _TASKS_STAMP[0] == before
+        f.write(_dumps(task) + b"\n")
+        f.flush()
+        if cached:
+            # Write the new task through to the cache as well
+            tasks, _ = _TASKS_CACHE
+            tasks[next_id] = task
+            _TASKS_CACHE = (tasks, next_id + 1)
+            _TASKS_STAMP = (_file_stamp(os.fstat(f.fileno())), _TASKS_STAMP[1])
+        log.info("Task appended to the file.")
+    return task
+
+
+def _add(tasks, next_id, description):
+    """Add a new task with ID `next_id` to `tasks`. Return it, or None."""
     if not description.strip():
-        logging.warning("Task description cannot be empty.")
+        log.warning("Task description cannot be empty.")
         print("Error: Task description cannot be empty.")
-        return
-    tasks = load_tasks()
+        return None
     task = {
-        "id": len(tasks) + 1,
+        "id": next_id,
         "description": description.strip(),
         "completed": False
     }
-    tasks.append(task)
-    save_tasks(tasks)
+    tasks[task["id"]] = task
     print(f"✅ Task added: {description.strip()}")
+    return task
+
+
+def _complete(tasks, task_id):
+    """Mark a task in `tasks` as completed. Return True if the tasks changed."""
+    task_id = int(task_id)
+    task = tasks.get(task_id)
+    if task is None:
+        print(f"⚠️ Task ID {task_id} not found.")
+        return False
+    if task["completed"]:
+        print(f"⚠️ Task {task_id} is already marked as completed.")
+        return False
+    task["completed"] = True
+    print(f"✅ Task {task_id} completed: {task['description']}")
+    return True
+
+
+def _delete(tasks, task_id):
+    """Delete a task from `tasks`. Return True if the tasks changed."""
+    task_id = int(task_id)
+    if tasks.pop(task_id, None) is None:
+        print(f"⚠️ Task ID {task_id} not found.")
+        return False
+    print(f"🗑️ Task {task_id} deleted.")
+    return True
+
+
+@_task_lock()
+def add_task(description):
+    """Add a new task."""
+    description = description.strip()
+    if description and _append_task(description):
+        print(f"✅ Task added: {description}")
+        return
+    tasks, next_id = load_tasks()
+    task = _add(tasks, next_id, description)
+    if task is not None:
+        save_tasks(tasks, task["id"] + 1)
 
 
 def list_tasks():
     """List all tasks."""
-    tasks = load_tasks()
+    tasks, _ = load_tasks()
     if not tasks:
         print("No tasks available. 🗒️ Start by adding one using `add` command.")
         return
-    print("\n🗒️ Your Tasks:")
-    print("-" * 30)
-    for task in tasks:
+    # Build the whole listing first so it goes out in a single write
+    lines = ["\n🗒️ Your Tasks:", "-" * 30]
+    for task in tasks.values():
         status = "✓" if task["completed"] else "✗"
-        print(f"ID: {task['id']} | [{status}] {task['description']}")
-    print("-" * 30)
+        lines.append(f"ID: {task['id']} | [{status}] {task['description']}")
+    lines.append("-" * 30)
+    sys.stdout.write("\n".join(lines) + "\n")
 
 
+@_task_lock()
 def complete_task(task_id):
-    """Mark a task as completed."""
-    tasks = load_tasks()
-    task_id = int(task_id)
-    task_found = False
-    for task in tasks:
-        if task["id"] == task_id:
-            if task["completed"]:
-                print(f"⚠️ Task {task_id} is already marked as completed.")
-                return
-            task["completed"] = True
-            task_found = True
-            save_tasks(tasks)
-            print(f"✅ Task {task_id} completed: {task['description']}")
-            return
-    if not task_found:
-        print(f"⚠️ Task ID {task_id} not found.")
+    """Mark a task as completed.
+
+    The change is appended to the change log rather than rewriting the
+    task file, which is only rewritten once the log reaches WAL_LIMIT.
+    """
+    global _TASKS_STAMP
+    tasks, next_id = load_tasks()
+    if not _complete(tasks, task_id):
+        return
+    try:
+        start, end = _append_wal({"op": "complete", "id": int(task_id)})
+    except OSError as e:
+        log.error("Failed to log completion: %s", e)
+        save_tasks(tasks, next_id)
+        return
+    if end >= WAL_LIMIT:
+        save_tasks(tasks, next_id)
+    elif _TASKS_STAMP is not None and _TASKS_STAMP[1] == start:
+        # Apply our own entry to the cache instead of replaying the log
+        _TASKS_CACHE[0][int(task_id)]["completed"] = True
+        _TASKS_STAMP = (_TASKS_STAMP[0], end)
 
 
+@_task_lock()
 def delete_task(task_id):
     """Delete a task."""
-    tasks = load_tasks()
-    task_id = int(task_id)
-    filtered_tasks = [task for task in tasks if task["id"] != task_id]
-    if len(tasks) == len(filtered_tasks):
-        print(f"⚠️ Task ID {task_id} not found.")
-        return
-    for idx, task in enumerate(filtered_tasks, start=1):
-        task["id"] = idx  # Reassign IDs after deletion
-    save_tasks(filtered_tasks)
-    print(f"🗑️ Task {task_id} deleted.")
+    tasks, next_id = load_tasks()
+    if _delete(tasks, task_id):
+        save_tasks(tasks, next_id)
+
+
+class TodoSession:
+    """Batch of task mutations applied to a single in-memory task dict."""
+
+    def __init__(self, tasks, next_id):
+        self.tasks = tasks
+        self.next_id = next_id
+        self.changed = False
+
+    def add(self, description):
+        """Add a new task."""
+        task = _add(self.tasks, self.next_id, description)
+        if task is not None:
+            self.next_id = task["id"] + 1
+            self.changed = True
+
+    def complete(self, task_id):
+        """Mark a task as completed."""
+        self.changed |= _complete(self.tasks, task_id)
+
+    def delete(self, task_id):
+        """Delete a task."""
+        self.changed |= _delete(self.tasks, task_id)
+
+
+@contextlib.contextmanager
+def todo_session():
+    """Load tasks once, apply several mutations, and save them once on exit.
+
+    Nothing is saved if the body raises. Other writers wait until the
+    session ends.
+    """
+    global _TASKS_STAMP
+    with _task_lock():
+        session = TodoSession(*load_tasks())
+        try:
+            yield session
+        except BaseException:
+            _TASKS_STAMP = None  # Force the next load to re-read the file
+            raise
+        if session.changed:
+            save_tasks(session.tasks, session.next_id)
 
 
 def clear_all_tasks():
     """Clear all tasks."""
     confirmation = input("⚠️ Are you sure you want to delete all tasks? (y/n): ")
     if confirmation.lower() == "y":
-        save_tasks([])
+        # Keep the ID counter so no ID (or logged change to it) is ever reused
+        with _task_lock():
+            _, next_id = load_tasks()
+            save_tasks({}, next_id)
         print("🗑️ All tasks have been cleared.")
     else:
         print("Operation canceled.")
@@ -144,39 +568,63 @@ def print_help():
     print(help_text)
 
 
+def configure_logging():
+    """Set up logging for the CLI.
+
+    Set TODO_LOG=INFO for chatty output and TODO_LOG_FILE to keep a log file.
+    Importing this module leaves logging configuration to the importer.
+    """
+    handlers = [logging.StreamHandler()]
+    if os.environ.get("TODO_LOG_FILE"):
+        handlers.append(logging.FileHandler(os.environ["TODO_LOG_FILE"]))
+    # Accept a level name or number; getLevelName() maps known names to ints
+    level_setting = (os.environ.get("TODO_LOG") or "WARNING").strip().upper()
+    if level_setting.isdigit():
+        level = int(level_setting)
+    else:
+        level = logging.getLevelName(level_setting)
+    logging.basicConfig(
+        level=level if isinstance(level, int) else logging.WARNING,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+        handlers=handlers
+    )
+    if not isinstance(level, int):
+        log.warning("Unknown TODO_LOG level %r. Using WARNING.", level_setting)
+
+
+# Command name -> (handler taking the remaining arguments, error printed
+# when a required argument is missing)
+COMMANDS = {
+    "add": (lambda args: add_task(" ".join(args)), "❌ Error: Task description required."),
+    "list": (lambda args: list_tasks(), None),
+    "complete": (lambda args: complete_task(args[0]), "❌ Error: Task ID required."),
+    "delete": (lambda args: delete_task(args[0]), "❌ Error: Task ID required."),
+    "clear": (lambda args: clear_all_tasks(), None),
+    "help": (lambda args: print_help(), None),
+}
+
+
 if __name__ == "__main__":
+    configure_logging()
     try:
         if len(sys.argv) < 2:
             print_help()
             sys.exit(1)
 
         command = sys.argv[1].lower()
-        if command == "add":
-            if len(sys.argv) < 3:
-                print("❌ Error: Task description required.")
-            else:
-                add_task(" ".join(sys.argv[2:]))
-        elif command == "list":
-            list_tasks()
-        elif command == "complete":
-            if len(sys.argv) < 3:
-                print("❌ Error: Task ID required.")
-            else:
-                complete_task(sys.argv[2])
-        elif command == "delete":
-            if len(sys.argv) < 3:
-                print("❌ Error: Task ID required.")
-            else:
-                delete_task(sys.argv[2])
-        elif command == "clear":
-            clear_all_tasks()
-        elif command == "help":
-            print_help()
-        else:
+        args = sys.argv[2:]
+        entry = COMMANDS.get(command)
+        if entry is None:
             print(f"❌ Unknown command: {command}")
             print_help()
+        else:
+            handler, missing_arg_error = entry
+            if missing_arg_error and not args:
+                print(missing_arg_error)
+            else:
+                handler(args)
     except ValueError:
         print("❌ Error: Task ID must be a valid number.")
     except Exception as e:
-        logging.error(f"Unexpected error: {e}")
+        log.error("Unexpected error: %s", e)
         print(f"❌ Unexpected error occurred: {e}")